@@ -1,15 +1,51 @@
 import argparse
-import logging
 import base64
-from functools import reduce
+import binascii
+import logging
+import re
+import string
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
 from typing import List
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urlparse, ParseResult
 
+try:
+    import pybase64
+except ImportError:
+    pybase64 = base64
+
 from medusa.config import config, template
 from medusa.subconverter import SubConverter
 
+_BASE64_ALPHABET = (string.ascii_letters + string.digits + "+/=-_ \t\r\n").encode()
+_URLSAFE_TO_STANDARD = bytes.maketrans(b"-_", b"+/")
+_PROXY_LINE_RE = re.compile(rb"^(?:ss|trojan|vmess|vless)://[^\r\n]*", re.MULTILINE)
+
+
+class _CappedRetry(Retry):
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, 30.0)
+
+
+_ADAPTER = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=_CappedRetry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 503),
+    ),
+)
+_SESSION = requests.Session()
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
 
 def setup_logger():
     logging.basicConfig(
@@ -19,12 +55,52 @@ def setup_logger():
     )
 
 
+@lru_cache(maxsize=8192)
+def _cached_urlparse(url: bytes) -> ParseResult:
+    return urlparse(url.decode())
+
+
 def fetch_config(url: str) -> List[ParseResult]:
-    logging.info(f"Handling subscription {url}")
-    b64 = requests.get(url)
-    hosts = base64.b64decode(b64.content).decode().splitlines(keepends=False)
-    print(hosts[0])
-    return [urlparse(host) for host in hosts if len(host)]
+    logging.info("Handling subscription %s", url)
+    content = bytearray()
+    with _SESSION.get(url, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=1 << 16):
+            content += chunk
+    # ':' is not in the base64 alphabet, so any URL means a plain-text list
+    head = content[:1024]
+    plain_text = b"://" in head
+    if not plain_text:
+        if head.translate(None, _BASE64_ALPHABET):
+            raise ValueError(f"Subscription {url} is neither base64 nor plain text")
+        content = content.translate(_URLSAFE_TO_STANDARD, b" \t\r\n")
+        content += b"=" * (-len(content) % 4)
+        try:
+            content = pybase64.b64decode(content)
+        except binascii.Error as e:
+            # only pay for a full scan when decoding actually failed
+            stray = bytes(content.translate(None, _BASE64_ALPHABET)[:16])
+            reason = f"stray bytes: {stray!r}" if stray else str(e)
+            raise ValueError(
+                f"Subscription {url} is not valid base64 ({reason})"
+            ) from e
+    hosts = _PROXY_LINE_RE.findall(content)
+    if plain_text and not hosts:
+        # e.g. an HTML error or login page that merely contains a link
+        raise ValueError(f"Subscription {url} is neither base64 nor plain text")
+    return [_cached_urlparse(host) for host in hosts]
+
+
+def fetch_configs(urls: List[str]) -> List[List[ParseResult]]:
+    def fetch(url: str) -> List[ParseResult]:
+        try:
+            return fetch_config(url)
+        except Exception:
+            logging.exception("Failed to fetch subscription %s", url)
+            return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(16, len(urls)))) as executor:
+        return list(executor.map(fetch, urls))
 
 
 def main():
@@ -33,16 +109,17 @@ def main():
     parser.add_argument("-o", "--output", type=str, required=True)
     parser.add_argument("--backend", type=str, required=False, default="glider")
     args = parser.parse_args()
-    pr_list = list()
-    for url in config()["subscriptions"]:
-        results = fetch_config(url)
-        pr_list.append(SubConverter.convert(args.backend, results))
-
-    result = list(map(lambda e: f"{e}\n", reduce(list.__add__, pr_list)))
-    with open(args.output, "w") as f:
-        content = template(args.backend)
-        f.writelines(content)
-        f.writelines(result)
+    hosts_list = fetch_configs(config()["subscriptions"])
+    if not any(hosts_list):
+        logging.error("No subscription produced any hosts, keeping %s", args.output)
+        return 1
+    pr_list = [SubConverter.convert(args.backend, results) for results in hosts_list]
+
+    result = list(chain.from_iterable(pr_list))
+    with open(args.output, "wb", buffering=1 << 20) as f:
+        f.write(template(args.backend))
+        if result:
+            f.write(("\n".join(result) + "\n").encode())
     return
 
 
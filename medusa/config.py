@@ -3,6 +3,11 @@ from functools import cache
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as Loader
+except ImportError:
+    from yaml import SafeLoader as Loader
+
 
 CONFIG_DIR = f"{os.path.dirname(__file__)}/configs"
 
@@ -10,7 +15,7 @@ CONFIG_DIR = f"{os.path.dirname(__file__)}/configs"
 @cache
 def __config(path: str):
     with open(path, "r") as f:
-        return yaml.load(f, yaml.FullLoader)
+        return yaml.load(f, Loader)
 
 
 def config(file: str = "config"):
@@ -19,9 +24,9 @@ def config(file: str = "config"):
 
 @cache
 def __template(path: str):
-    with open(path, "r") as f:
-        return f.readlines()
+    with open(path, "rb") as f:
+        return f.read()
 
 
-def template(backend: str):
+def template(backend: str) -> bytes:
     return __template(f"{CONFIG_DIR}/{backend}_template.conf")
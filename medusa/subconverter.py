@@ -1,14 +1,21 @@
 import base64
 import logging
+from functools import lru_cache
 from typing import List
-from urllib.parse import ParseResult, unquote, parse_qs, urlparse, urlunparse
+from urllib.parse import ParseResult, unquote, parse_qs
+
+try:
+    import pybase64
+except ImportError:
+    pybase64 = base64
 
 
 def b64decode_urlsafe(s: str) -> str:
-    missing_padding = len(s) % 4
-    if missing_padding != 0:
-        s += "=" * (4 - missing_padding)
-    return base64.urlsafe_b64decode(s).decode()
+    # short strings (ss:// userinfo) don't amortize pybase64's SIMD setup;
+    # the stdlib decoder also ignores surplus padding, so no length math
+    if len(s) < 32:
+        return base64.urlsafe_b64decode(s + "===").decode()
+    return pybase64.urlsafe_b64decode(s + "=" * (-len(s) % 4)).decode()
 
 
 class SubConverter:
@@ -16,22 +23,9 @@ class SubConverter:
     def dedup_urls(urls):
         deduped_urls = {}
         for url in urls:
-            parsed_url = urlparse(url)
-            url_without_fragment = urlunparse(
-                (
-                    parsed_url.scheme,
-                    parsed_url.netloc,
-                    parsed_url.path,
-                    parsed_url.params,
-                    parsed_url.query,
-                    "",
-                )
-            )
-            if (
-                url_without_fragment not in deduped_urls
-                or not deduped_urls[url_without_fragment]
-            ):
-                deduped_urls[url_without_fragment] = parsed_url.fragment
+            url_without_fragment, _, fragment = url.partition("#")
+            if not deduped_urls.get(url_without_fragment):
+                deduped_urls[url_without_fragment] = fragment
         final_urls = [
             url + ("#" + fragment if fragment else "")
             for url, fragment in deduped_urls.items()
@@ -48,55 +42,38 @@ class SubConverter:
 
     @staticmethod
     def _to_glider(parse_results: List[ParseResult]):
-        def handle_ss(ss: ParseResult):
-            return "".join(
-                (
-                    "forward=",
-                    ss.scheme,
-                    "://",
-                    ss.username,
-                    ":",
-                    ss.password,
-                    "@",
-                    ss.hostname,
-                    ":",
-                    str(ss.port),
-                    "#",
-                    unquote(ss.fragment),
-                )
-            )
-
-        def handle_trojan(tj: ParseResult):
-            return "".join(
-                (
-                    "forward=",
-                    tj.scheme,
-                    "://",
-                    tj.username,
-                    "@",
-                    tj.hostname,
-                    ":",
-                    str(tj.port),
-                    "?",
-                    f"serverName={parse_qs(tj.query).get('sni')}",
-                    "&skip-cert-verify=true",
-                    "#",
-                    unquote(tj.fragment),
-                )
-            )
-
         res = list()
         for r in parse_results:
-            logging.info(f"Preprocessing {r}")
-            if r.scheme == "ss":
-                if r.username is None:
-                    netloc = b64decode_urlsafe(r.netloc)
-                    r = urlparse(urlunparse(r).replace(r.netloc, netloc))
-                if r.password is None:
-                    username = b64decode_urlsafe(r.username)
-                    r = urlparse(urlunparse(r).replace(r.username, username))
-            logging.info(f"Handling {r}")
-            pr = eval(f"handle_{r.scheme}")(r)
-            logging.info(f"Constructed '{pr}'")
+            logging.info("Handling %s", r)
+            # duplicates differ only in their fragment, so cache on the rest
+            match r.scheme:
+                case "ss":
+                    pr = _glider_ss(r._replace(fragment=""))
+                case "trojan":
+                    pr = _glider_trojan(r._replace(fragment=""))
+                case _:
+                    logging.warning("Skipping unsupported scheme '%s'", r.scheme)
+                    continue
+            pr = f"{pr}#{unquote(r.fragment) if r.fragment else ''}"
+            logging.info("Constructed '%s'", pr)
             res.append(pr)
         return SubConverter.dedup_urls(res)
+
+
+@lru_cache(maxsize=4096)
+def _glider_ss(ss: ParseResult) -> str:
+    if ss.username is None:
+        ss = ss._replace(netloc=b64decode_urlsafe(ss.netloc))
+    if ss.password is None:
+        username = b64decode_urlsafe(ss.username)
+        host = ss.netloc.rpartition("@")[2]
+        ss = ss._replace(netloc=f"{username}@{host}")
+    return f"forward={ss.scheme}://{ss.username}:{ss.password}@{ss.hostname}:{ss.port}"
+
+
+@lru_cache(maxsize=4096)
+def _glider_trojan(tj: ParseResult) -> str:
+    return (
+        f"forward={tj.scheme}://{tj.username}@{tj.hostname}:{tj.port}"
+        f"?serverName={parse_qs(tj.query).get('sni')}&skip-cert-verify=true"
+    )
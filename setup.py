@@ -42,6 +42,9 @@ setup(
         'requests==2.31.0',
         'pyyaml==6.0'
     ],
+    extras_require={
+        "speedups": ["pybase64==1.3.2", "brotli==1.1.0", "zstandard==0.22.0"],
+    },
     package_dir={"": "."},
     package_data={
         f"{PROJECT_NAME}.configs": ["*.yml"],